@@ -74,10 +74,11 @@ class EnergySystem:
 
     def get_energy(self, group_id: str) -> float:
         """获取群组当前能量"""
-        if group_id not in self._energies:
-            self._energies[group_id] = self.cfg.initial_energy
+        energy = self._energies.get(group_id)
+        if energy is None:
+            energy = self._energies[group_id] = self.cfg.initial_energy
             self._last_update[group_id] = time.time()
-        return self._energies[group_id]
+        return energy
 
     def consume(self, group_id: str, reply_length: int, streak: int = 0) -> float:
         """
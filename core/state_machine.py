@@ -136,9 +136,10 @@ class FlowStateMachine:
 
     def get_state(self, group_id: str) -> GroupState:
         """获取群组状态，不存在则创建"""
-        if group_id not in self._states:
-            self._states[group_id] = GroupState(group_id=group_id)
-        return self._states[group_id]
+        state = self._states.get(group_id)
+        if state is None:
+            state = self._states[group_id] = GroupState(group_id=group_id)
+        return state
 
     def on_message(self, event, context) -> StateTransition:
         """
@@ -151,7 +152,8 @@ class FlowStateMachine:
         Returns:
             StateTransition: 状态转换结果
         """
-        group_id = event.get_group_id()
+        # 上下文已携带 group_id，避免再次调用事件 getter
+        group_id = getattr(context, "group_id", None) or event.get_group_id()
         current_time = time.time()
 
         state = self.get_state(group_id)
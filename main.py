@@ -11,14 +11,18 @@ AstrBot 群聊插件 v2.0
 """
 
 import asyncio
+import re
+import time
 from datetime import datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent, MessageChain, filter
-from astrbot.api.provider import LLMResponse
 from astrbot.api.star import Context, Star, register
 
+if TYPE_CHECKING:
+    from astrbot.api.provider import LLMResponse
+
 from .core.decision_engine import DecisionEngine
 from .core.energy_system import EnergySystem
 from .core.state_machine import FlowState, FlowStateMachine
@@ -35,6 +39,11 @@ from .perception.topic_tracker import TopicTracker
 from .storage.persistence import PersistenceManager
 
 
+def _coerce_floats(stats: dict, keys: tuple, default: float = 0.0) -> dict:
+    """批量取出统计值并强制转换为 float，缺失或空值回退为默认值"""
+    return {k: float(stats.get(k) or default) for k in keys}
+
+
 @register(
     "astrbot_plugin_group_chat",
     "qa296",
@@ -49,6 +58,19 @@ class GroupChatPlugin(Star):
         super().__init__(context)
         self.config = config
 
+        # 高频配置在初始化时解析一次，避免每条消息重复查表
+        self._list_mode = config.get("list_mode", "blacklist")
+        self._listed_groups = frozenset(config.get("groups", []))
+        air_config = config.get("air_reading", {})
+        self._air_reading_enabled = air_config.get("enabled", True)
+        self._no_reply_marker = air_config.get("no_reply_marker", "<NO_RESPONSE>")
+        # 读空气关闭或未配置标记时为 None，钩子可借此直接跳过扫描
+        self._marker_re = (
+            re.compile(re.escape(self._no_reply_marker))
+            if self._air_reading_enabled and self._no_reply_marker
+            else None
+        )
+
         logger.info("群聊插件 v2.0 初始化中...")
 
         # 1. 持久化管理器
@@ -86,6 +108,10 @@ class GroupChatPlugin(Star):
         self._save_task = None
         self._running = False
 
+        # 短 TTL 的活跃度测量缓存：{group_id: (ts, ActivityMetrics)}
+        # 状态命令可复用刚处理完触发消息时测得的值，避免重复测量
+        self._activity_cache: dict[str, tuple[float, Any]] = {}
+
         # 统计信息
         self._stats = {
             "messages_processed": 0,
@@ -129,8 +155,10 @@ class GroupChatPlugin(Star):
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
     async def on_group_message(self, event: AstrMessageEvent):
         """处理群聊消息的主入口"""
+        # 事件字段只读取一次，后续统一使用局部变量
         group_id = event.get_group_id()
         user_id = event.get_sender_id()
+        message_str = event.message_str
 
         # 1. 权限检查
         if not self._check_group_permission(group_id):
@@ -149,10 +177,11 @@ class GroupChatPlugin(Star):
 
         # 补充活跃度指标
         activity_metrics = self.activity_meter.measure(group_id)
+        self._activity_cache[group_id] = (time.time(), activity_metrics)
         context.group_activity = activity_metrics.overall_activity
 
         # 5. 话题追踪
-        topic_result = self.topic_tracker.track(group_id, event.message_str, user_id)
+        topic_result = self.topic_tracker.track(group_id, message_str, user_id)
         context.topic_coherence = topic_result.topic_coherence
 
         # 6. 状态机：处理消息并更新状态
@@ -181,12 +210,15 @@ class GroupChatPlugin(Star):
 
         # 12. 执行层：生成并发送回复
         if decision.should_act and timing.should_reply_now:
-            # 添加延迟
+            # 回复生成与拟人化延迟无数据依赖，并发执行：
+            # 发送时机不变，总等待从 延迟+生成 缩短为 max(延迟, 生成)
             if decision.delay_seconds > 0:
-                await asyncio.sleep(decision.delay_seconds)
-
-            # 生成回复
-            response = await self.response_generator.generate(event, context, decision)
+                response, _ = await asyncio.gather(
+                    self.response_generator.generate(event, context, decision),
+                    asyncio.sleep(decision.delay_seconds),
+                )
+            else:
+                response = await self.response_generator.generate(event, context, decision)
 
             if response:
                 yield event.plain_result(response)
@@ -224,26 +256,27 @@ class GroupChatPlugin(Star):
 
         # 13. 检查是否有反馈
         feedback = self.feedback_collector.check_message_for_feedback(
-            group_id, user_id, event.message_str, context.is_at_bot
+            group_id, user_id, message_str, context.is_at_bot
         )
 
         if feedback:
             self._handle_feedback(group_id, feedback, decision)
 
     @filter.on_llm_response()
-    async def on_llm_response(self, event: AstrMessageEvent, resp: LLMResponse):
+    async def on_llm_response(self, event: AstrMessageEvent, resp: "LLMResponse"):
         """LLM 响应钩子：处理读空气标记"""
+        # 快路径：读空气关闭或未配置标记时，此钩子无事可做
+        if self._marker_re is None:
+            return
+
         try:
             if resp.role != "assistant":
                 return
 
             # 检查读空气标记
-            air_config = self.config.get("air_reading", {})
-            if air_config.get("enabled", True):
-                marker = air_config.get("no_reply_marker", "<NO_RESPONSE>")
-                if marker in (resp.completion_text or ""):
-                    logger.debug("检测到读空气标记，阻止消息发送")
-                    event.clear_result()
+            if self._marker_re.search(resp.completion_text or ""):
+                logger.debug("检测到读空气标记，阻止消息发送")
+                event.clear_result()
 
         except Exception as e:
             logger.error(f"处理 LLM 响应钩子时发生错误: {e}")
@@ -264,13 +297,21 @@ class GroupChatPlugin(Star):
         # 获取状态
         state = self.state_machine.get_state(group_id)
         energy = self.energy_system.get_energy(group_id)
-        timing_stats = self.timing_controller.get_stats(group_id)
-        strategy_stats = self.strategy_store.get_stats(group_id)
+        timing_stats = _coerce_floats(
+            self.timing_controller.get_stats(group_id), ("cooldown_remaining",)
+        )
+        strategy_stats = _coerce_floats(
+            self.strategy_store.get_stats(group_id), ("hit_rate",)
+        )
         decision_stats = self.decision_engine.get_stats()
         feedback_stats = self.feedback_collector.get_stats()
 
-        # 活跃度
-        activity_metrics = self.activity_meter.measure(group_id)
+        # 活跃度：优先复用 on_group_message 刚测得的结果
+        cached = self._activity_cache.get(group_id)
+        if cached and time.time() - cached[0] < 5.0:
+            activity_metrics = cached[1]
+        else:
+            activity_metrics = self.activity_meter.measure(group_id)
 
         # 构建消息
         msg = (
@@ -409,13 +450,10 @@ class GroupChatPlugin(Star):
 
     def _check_group_permission(self, group_id: str) -> bool:
         """检查群组权限"""
-        list_mode = self.config.get("list_mode", "blacklist")
-        groups = self.config.get("groups", [])
-
-        if list_mode == "blacklist":
-            return group_id not in groups
+        if self._list_mode == "blacklist":
+            return group_id not in self._listed_groups
         else:
-            return group_id in groups
+            return group_id in self._listed_groups
 
     def _handle_feedback(self, group_id: str, feedback, decision):
         """处理反馈"""
@@ -0,0 +1,7 @@
+"""
+回复引擎模块 - 传统阈值决策与基于LLM的读空气
+"""
+
+from .response_engine import ResponseEngine
+
+__all__ = ["ResponseEngine"]
@@ -1,10 +1,64 @@
+import asyncio
+import re
 import time
-from typing import Any, Dict
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
 
 from astrbot.api import logger
 from astrbot.api.star import Context
 from astrbot.api.event import AstrMessageEvent
 
+# 提示词模板提升为模块级常量，避免每条消息重新构建大段 f-string。
+# 读空气模板拆为固定前缀/后缀两段，每次调用只构建中间的可变上下文块，
+# 两段大体量字面量仅被 join 引用而不会整体复制。
+_AIR_READING_PREFIX = """你是一个拟人化的聊天助手，需要判断是否应该回复以下消息。你的任务是“读空气”，即根据上下文判断当前聊天氛围是否适合回复。
+
+【当前消息】
+"""
+
+_AIR_READING_SUFFIX_TEMPLATE = """
+
+【判断与回复指令】
+请根据以上所有信息，判断是否应该回复这条消息。
+
+**如果你认为不应该回复**，请只回复以下标记，不要添加任何其他文字或解释：
+{no_reply_marker}
+
+**如果你认为应该回复**，请直接给出你自然、友好的回复内容。
+
+**判断和回复时请综合考虑以下因素：**
+1.  **相关性**：消息是否直接与你相关，或是在与你对话？
+2.  **必要性**：这条消息是否需要一个回应？
+3.  **氛围**：当前的聊天氛围是开放、轻松的，还是严肃、私密的？你的加入是否合适？
+4.  **打扰**：你的回复是否会打断别人的重要对话或破坏当前氛围？
+5.  **内容**：消息是否有实质性的内容值得回应？（例如，简单的“哈哈哈”或表情包可能不需要回应）
+
+请开始你的判断和回复："""
+
+_RESPONSE_TEMPLATE = """请根据以下上下文，对收到的消息生成一个自然、友好的回复。
+
+【收到的消息】
+用户ID: {user_id}
+消息内容: {message_content}
+
+【辅助上下文信息】
+- 用户印象摘要: {impression_summary}
+- 相关记忆: {memories_str}
+- 最近对话片段: {history_str}
+
+【回复要求】
+1.  **自然拟人**：你的回复应该像一个真实的人，而不是机器人。可以使用口语化的表达。
+2.  **语境贴合**：回复内容需要与当前聊天的主题和氛围保持一致。
+3.  **简洁明了**：避免过长或过于复杂的句子，直接回应消息的核心内容。
+4.  **富有个性**：如果用户印象中有相关信息（例如，用户喜欢幽默），可以适当融入你的回复风格中。
+
+请开始你的回复："""
+
+# 基础 system prompt 同样提升为模块级常量
+_AIR_READING_SYS_PROMPT = "你是一个极其擅长'读空气'的聊天助手。你的核心任务是判断在特定聊天场景下，回复是否恰当。你需要理解社交暗示、聊天氛围和人际关系，从而做出最合适的决定：回复或保持沉默。"
+_NORMAL_RESPONSE_SYS_PROMPT = "你是一个拟人化的聊天助手。你的回复风格应该自然、友好、富有同理心，并且完全符合当前的聊天语境。请避免过于机械或官方的语气。"
+
+
 class ResponseEngine:
     """
     回复引擎：负责决定是否回复以及生成回复内容。
@@ -21,33 +75,73 @@ class ResponseEngine:
         """
         self.context = context
         self.config = config
-        # 人格缓存：{persona_name: {"prompt": str, "timestamp": float}}
-        self._persona_cache = {}
+        # 人格缓存：有界 TTL LRU，正负结果均缓存
+        # {(uid, persona_name): {"enabled": bool, "persona_name": str, "preface": str, "ts": float}}
+        self._persona_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._persona_cache_maxsize = 256
+        self._persona_cache_ttl = 300.0
+        # personas 为列表时惰性构建 name->persona 索引，按列表对象身份失效
+        self._persona_index: Dict[str, Any] | None = None
+        self._persona_index_src_id: int | None = None
+        # 高频配置只在初始化时解析一次
+        self._persona_injection_enabled = (
+            config.get("enable_persona_injection", True) if isinstance(config, dict) else True
+        )
+        # 不回复标记：优先使用配置中的标记，并兼容历史写法
+        cfg_marker = getattr(config, "air_reading_no_reply_marker", None)
+        self._no_reply_marker = cfg_marker or "[DO_NOT_REPLY]"
+        self._no_reply_markers = tuple(
+            m for m in (cfg_marker, "<NO_RESPONSE>", "[DO_NOT_REPLY]") if m
+        )
+        # 读空气模板后缀只含固定文案与标记，按实例填充一次
+        self._air_reading_suffix = _AIR_READING_SUFFIX_TEMPLATE.format(
+            no_reply_marker=self._no_reply_marker
+        )
+        # 预编译为单个正则交替式，一次扫描替代逐标记的子串查找
+        self._no_reply_marker_re = re.compile(
+            "|".join(re.escape(m) for m in self._no_reply_markers)
+        )
+        # LLM 提供商引用缓存：短 TTL 内复用，避免每次决策都查询提供商注册表
+        self._cached_provider = None
+        self._provider_cached_at = 0.0
+        self._provider_cache_ttl = 30.0
+        # 读空气预过滤阈值：消息过短，或意愿与好感度同时过低时，直接跳过 LLM
+        self._prefilter_min_length = int(getattr(config, "air_reading_prefilter_min_length", 2))
+        self._prefilter_min_willingness = float(getattr(config, "air_reading_prefilter_min_willingness", 0.15))
+        self._prefilter_min_user_score = float(getattr(config, "air_reading_prefilter_min_user_score", 0.3))
     
     async def generate_response(self, event: Any, chat_context: Dict[str, Any], willingness_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成回复的主入口函数。
         根据意愿计算的结果，决定是使用传统阈值判断还是LLM“读空气”来判断是否回复。
-        
+
         Args:
             event: AstrBot的消息事件对象。
             chat_context: 由ContextAnalyzer提供的完整聊天上下文。
             willingness_result: 由WillingnessCalculator提供的意愿计算结果。
-            
+
         Returns:
             一个包含回复决策和内容的字典。
         """
         logger.debug(f"ResponseEngine: 开始生成回复。需要LLM决策: {willingness_result.get('requires_llm_decision')}")
-        
+
+        # 事件 getter 只在入口调用一次，向下传递局部值
+        user_id = event.get_sender_id()
+        message_str = event.message_str or ""
+
         # 如果需要 LLM 决策，进行读空气
         if willingness_result.get("requires_llm_decision"):
             logger.info("ResponseEngine: 进入LLM读空气决策流程。")
-            return await self._generate_with_air_reading(event, chat_context, willingness_result)
+            return await self._generate_with_air_reading(
+                event, chat_context, willingness_result, user_id, message_str
+            )
         else:
             # 传统回复生成
             logger.info("ResponseEngine: 进入传统阈值决策流程。")
             if willingness_result.get("should_respond"):
-                response_content = await self._generate_normal_response(event, chat_context)
+                response_content = await self._generate_normal_response(
+                    event, chat_context, user_id, message_str
+                )
                 return {
                     "should_reply": True,
                     "content": response_content,
@@ -63,20 +157,44 @@ class ResponseEngine:
                     "willingness_score": willingness_result.get("willingness_score")
                 }
     
+    def _get_provider(self):
+        """
+        获取当前使用的 LLM 提供商。
+        结果缓存 30 秒，在此窗口内切换提供商会在缓存过期后生效。
+        """
+        now = time.time()
+        if self._cached_provider is not None and now - self._provider_cached_at < self._provider_cache_ttl:
+            return self._cached_provider
+        provider = self.context.get_using_provider()
+        if provider is not None:
+            self._cached_provider = provider
+            self._provider_cached_at = now
+        return provider
+
+    def _persona_cache_put(self, cache_key: Tuple[str, str], entry: Dict[str, Any]) -> Dict[str, Any]:
+        """写入人格缓存，超出容量时淘汰最久未使用的条目。"""
+        cache = self._persona_cache
+        cache[cache_key] = entry
+        cache.move_to_end(cache_key)
+        if len(cache) > self._persona_cache_maxsize:
+            cache.popitem(last=False)
+        return entry
+
     async def _resolve_persona_text(self, event: Any) -> Dict[str, Any]:
         """
-        解析当前会话的人格设定（若有），返回用于注入的提示词。
-        加入缓存机制避免重复解析。
-        返回: {"enabled": bool, "persona_name": str, "persona_prompt": str}
+        解析当前会话的人格设定（若有），返回用于注入的提示词前缀。
+        使用有界 TTL LRU 缓存，"无人格/解析失败"的负向结果同样缓存，
+        避免每条消息都重新扫描 personas 列表和重新拼接前缀。
+        返回: {"enabled": bool, "persona_name": str, "preface": str}
         """
         try:
             # 可通过配置关闭注入
-            if isinstance(self.config, dict) and not self.config.get("enable_persona_injection", True):
-                return {"enabled": False, "persona_name": "", "persona_prompt": ""}
+            if not self._persona_injection_enabled:
+                return {"enabled": False, "persona_name": "", "preface": ""}
 
             pm = getattr(self.context, "provider_manager", None)
             if not pm:
-                return {"enabled": False, "persona_name": "", "persona_prompt": ""}
+                return {"enabled": False, "persona_name": "", "preface": ""}
 
             uid = getattr(event, "unified_msg_origin", None)
             conversation = None
@@ -91,7 +209,7 @@ class ResponseEngine:
             persona_id = getattr(conversation, "persona_id", None)
             # 显式取消人格
             if persona_id == "[%None]":
-                return {"enabled": False, "persona_name": "", "persona_prompt": ""}
+                return {"enabled": False, "persona_name": "", "preface": ""}
 
             # 选择 persona 名
             if persona_id:
@@ -100,97 +218,127 @@ class ResponseEngine:
                 selected = getattr(pm, "selected_default_persona", {}) or {}
                 persona_name = selected.get("name", "")
 
-            if not persona_name:
-                return {"enabled": False, "persona_name": "", "persona_prompt": ""}
-
-            # 检查缓存（学习Heartflow的缓存机制）
+            # 检查缓存（命中则 move-to-end 维持 LRU 顺序）
             current_time = time.time()
-            cache_key = persona_name
-            if cache_key in self._persona_cache:
-                cached = self._persona_cache[cache_key]
-                # 缓存5分钟内有效
-                if current_time - cached.get("timestamp", 0) < 300:
-                    logger.debug(f"使用人格缓存: {persona_name}")
-                    return {
-                        "enabled": True,
-                        "persona_name": persona_name,
-                        "persona_prompt": cached["prompt"]
-                    }
+            cache_key = (uid or "", persona_name)
+            cached = self._persona_cache.get(cache_key)
+            if cached is not None:
+                if current_time - cached.get("ts", 0) < self._persona_cache_ttl:
+                    self._persona_cache.move_to_end(cache_key)
+                    logger.debug(f"使用人格缓存: {persona_name or '(无人格)'}")
+                    return cached
+                # 过期条目直接移除
+                del self._persona_cache[cache_key]
+
+            # "未配置人格"的负向结果也写入缓存，跳过后续解析
+            if not persona_name:
+                return self._persona_cache_put(cache_key, {
+                    "enabled": False, "persona_name": "", "preface": "", "ts": current_time
+                })
 
             # 缓存未命中，正常解析
             personas = getattr(pm, "personas", {})
-            persona_data = None
-            # personas 可能是 dict 或 list
+            # personas 可能是 dict 或 list；列表场景构建一次索引，O(1) 查找替代逐元素扫描
             if isinstance(personas, dict):
-                persona_data = personas.get(persona_name)
+                index = personas
+            elif id(personas) == self._persona_index_src_id and self._persona_index is not None:
+                index = self._persona_index
             else:
                 try:
-                    for p in personas:
-                        name = getattr(p, "name", None) if hasattr(p, "name") else (p.get("name") if isinstance(p, dict) else None)
-                        if name == persona_name:
-                            persona_data = p
-                            break
+                    index = {
+                        (getattr(p, "name", None) or (p.get("name") if isinstance(p, dict) else None)): p
+                        for p in personas
+                    }
                 except Exception:
-                    persona_data = None
-
-            if not persona_data:
-                return {"enabled": False, "persona_name": persona_name, "persona_prompt": ""}
+                    index = {}
+                self._persona_index = index
+                self._persona_index_src_id = id(personas)
+            persona_data = index.get(persona_name)
 
             # 取 prompt 或 description
             if isinstance(persona_data, dict):
                 prompt = persona_data.get("prompt") or persona_data.get("description") or ""
-            else:
+            elif persona_data is not None:
                 prompt = getattr(persona_data, "prompt", "") or getattr(persona_data, "description", "") or ""
+            else:
+                prompt = ""
 
             if not prompt:
-                return {"enabled": False, "persona_name": persona_name, "persona_prompt": ""}
-
-            # 写入缓存
-            self._persona_cache[cache_key] = {
-                "prompt": prompt,
-                "timestamp": current_time
-            }
-
-            return {"enabled": True, "persona_name": persona_name, "persona_prompt": prompt}
+                return self._persona_cache_put(cache_key, {
+                    "enabled": False, "persona_name": persona_name, "preface": "", "ts": current_time
+                })
+
+            # 前缀拼接只在缓存未命中时发生一次
+            return self._persona_cache_put(cache_key, {
+                "enabled": True,
+                "persona_name": persona_name,
+                "preface": f"【人格设定：{persona_name}】\n{prompt}\n\n",
+                "ts": current_time,
+            })
         except Exception:
-            return {"enabled": False, "persona_name": "", "persona_prompt": ""}
+            return {"enabled": False, "persona_name": "", "preface": ""}
 
     def _compose_system_prompt_with_persona(self, base_prompt: str, persona: Dict[str, Any]) -> str:
         """
         将人格前缀与基础 system prompt 组合。
         """
-        if persona and persona.get("enabled") and persona.get("persona_prompt"):
-            name = persona.get("persona_name", "")
-            preface = f"【人格设定：{name}】\n{persona.get('persona_prompt','')}\n\n"
-            return preface + base_prompt
+        if persona and persona.get("enabled") and persona.get("preface"):
+            return persona["preface"] + base_prompt
         return base_prompt
 
-    async def _generate_with_air_reading(self, event: Any, chat_context: Dict[str, Any], willingness_result: Dict[str, Any]) -> Dict[str, Any]:
+    async def _generate_with_air_reading(
+        self,
+        event: Any,
+        chat_context: Dict[str, Any],
+        willingness_result: Dict[str, Any],
+        user_id: str,
+        message_str: str,
+    ) -> Dict[str, Any]:
         """
         实现基于LLM的“读空气”功能，让LLM决定是否回复。
-        
+
         Args:
             event: AstrBot的消息事件对象。
             chat_context: 完整的聊天上下文。
             willingness_result: 意愿计算结果。
-            
+            user_id: 入口处提取的发送者ID。
+            message_str: 入口处提取的消息文本。
+
         Returns:
             包含最终决策和回复内容的字典。
         """
+        # 低成本预过滤：明显不值得回复的消息直接跳过，省去一次 LLM 往返
+        message_text = message_str.strip()
+        base_willingness = willingness_result.get("decision_context", {}).get("base_willingness", 0.5)
+        user_score = chat_context.get("user_impression", {}).get("score", 0.5)
+        if len(message_text) < self._prefilter_min_length or (
+            base_willingness < self._prefilter_min_willingness
+            and user_score < self._prefilter_min_user_score
+        ):
+            logger.info("ResponseEngine: 预过滤判定跳过回复，未调用LLM。")
+            return {
+                "should_reply": False,
+                "content": None,
+                "decision_method": "air_reading",
+                "llm_response": None,
+                "skip_reason": "pre_filter",
+                "willingness_score": willingness_result.get("willingness_score")
+            }
+
         logger.debug("ResponseEngine: 构建读空气提示词。")
-        # 构建读空气提示
-        air_reading_prompt = await self._build_air_reading_prompt(event, chat_context, willingness_result)
-        
+        # 提示词构建与人格解析无数据依赖，并发执行以重叠 conversation_manager 的往返耗时
+        air_reading_prompt, persona = await asyncio.gather(
+            self._build_air_reading_prompt(chat_context, willingness_result, user_id, message_str),
+            self._resolve_persona_text(event),
+        )
+
         # 调用 LLM 进行读空气决策
-        llm_response = await self._call_llm_for_air_reading(air_reading_prompt, event)
+        llm_response = await self._call_chat(air_reading_prompt, _AIR_READING_SYS_PROMPT, persona)
         
         # 检查LLM的回复是否是不回复的标记（兼容多种写法与配置）
-        # 优先使用配置中的标记，其次兼容历史写法
-        cfg_marker = getattr(self.config, 'air_reading_no_reply_marker', None)
-        no_reply_markers = [m for m in [cfg_marker, "<NO_RESPONSE>", "[DO_NOT_REPLY]"] if m]
         resp_text = llm_response.strip()
 
-        if any(m in resp_text for m in no_reply_markers):
+        if self._no_reply_marker_re.search(resp_text):
             logger.info(f"ResponseEngine: LLM决定跳过回复。")
             return {
                 "should_reply": False,
@@ -211,21 +359,25 @@ class ResponseEngine:
                 "willingness_score": willingness_result.get("willingness_score")
             }
     
-    async def _build_air_reading_prompt(self, event: Any, chat_context: Dict[str, Any], willingness_result: Dict[str, Any]) -> str:
+    async def _build_air_reading_prompt(
+        self,
+        chat_context: Dict[str, Any],
+        willingness_result: Dict[str, Any],
+        user_id: str,
+        message_content: str,
+    ) -> str:
         """
         为“读空气”功能构建发送给LLM的提示词。
-        
+
         Args:
-            event: AstrBot的消息事件对象。
             chat_context: 完整的聊天上下文。
             willingness_result: 意愿计算结果。
-            
+            user_id: 发送者ID。
+            message_content: 消息文本。
+
         Returns:
             构建好的提示词字符串。
         """
-        user_id = event.get_sender_id()
-        message_content = event.message_str
-        
         # 获取上下文信息，并提供默认值以防止KeyError
         decision_context = willingness_result.get("decision_context", {})
         user_impression = chat_context.get("user_impression", {})
@@ -240,15 +392,16 @@ class ResponseEngine:
         interaction_mode = decision_context.get('interaction_mode', 'normal')
         impression_summary = user_impression.get('summary', '无印象信息')
         
-        memories_str = "\n".join([f"- {mem.get('content', '')}" for mem in relevant_memories[:3]]) if relevant_memories else "无相关记忆。"
-        history_str = "\n".join([f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in conversation_history[-3:]]) if conversation_history else "无最近对话。"
-
-        # 构建提示
-        no_reply_marker = getattr(self.config, 'air_reading_no_reply_marker', "[DO_NOT_REPLY]")
-        prompt = f"""你是一个拟人化的聊天助手，需要判断是否应该回复以下消息。你的任务是“读空气”，即根据上下文判断当前聊天氛围是否适合回复。
-
-【当前消息】
-用户ID: {user_id}
+        # 生成器直接喂给 join，省去一次性丢弃的中间列表
+        memories_str = "\n".join(
+            f"- {m['content']}" for m in relevant_memories[:3] if "content" in m
+        ) or "无相关记忆。"
+        history_str = "\n".join(
+            f"{m.get('role', '')}: {m.get('content', '')}" for m in conversation_history[-3:]
+        ) or "无最近对话。"
+
+        # 只构建可变的上下文块，固定前后缀通过 join 引用
+        context_block = f"""用户ID: {user_id}
 消息内容: {message_content}
 
 【上下文信息】
@@ -265,156 +418,116 @@ class ResponseEngine:
 {memories_str}
 
 【最近对话】
-{history_str}
+{history_str}"""
 
-【判断与回复指令】
-请根据以上所有信息，判断是否应该回复这条消息。
-
-**如果你认为不应该回复**，请只回复以下标记，不要添加任何其他文字或解释：
-{no_reply_marker}
-
-**如果你认为应该回复**，请直接给出你自然、友好的回复内容。
-
-**判断和回复时请综合考虑以下因素：**
-1.  **相关性**：消息是否直接与你相关，或是在与你对话？
-2.  **必要性**：这条消息是否需要一个回应？
-3.  **氛围**：当前的聊天氛围是开放、轻松的，还是严肃、私密的？你的加入是否合适？
-4.  **打扰**：你的回复是否会打断别人的重要对话或破坏当前氛围？
-5.  **内容**：消息是否有实质性的内容值得回应？（例如，简单的“哈哈哈”或表情包可能不需要回应）
+        prompt = "".join((_AIR_READING_PREFIX, context_block, self._air_reading_suffix))
 
-请开始你的判断和回复："""
-        
         logger.debug(f"ResponseEngine: 读空气提示词构建完成。长度: {len(prompt)}")
         return prompt
 
 
-    async def _call_llm_for_air_reading(self, prompt: str, event: Any) -> str:
+    async def _call_chat(self, prompt: str, base_sys_prompt: str, persona: Dict[str, Any]) -> str:
         """
-        调用LLM进行“读空气”决策。
-        
+        统一的 LLM 调用入口：读空气与正常回复共享提供商解析、
+        人格注入、system prompt 组合与异常处理。
+
         Args:
             prompt: 发送给LLM的提示词。
-            
+            base_sys_prompt: 基础 system prompt（模块级常量）。
+            persona: 由_resolve_persona_text预先解析好的人格信息。
+
         Returns:
-            LLM的原始回复文本。如果调用失败，返回空字符串。
+            LLM的原始回复文本。如果调用失败或内容为空，返回空字符串。
         """
         try:
-            provider = self.context.get_using_provider()
+            provider = self._get_provider()
             if not provider:
-                logger.error("ResponseEngine: 未找到可用的 LLM 提供商，无法进行读空气决策。")
+                logger.error("ResponseEngine: 未找到可用的 LLM 提供商。")
                 return ""
-            
-            logger.debug("ResponseEngine: 正在调用LLM提供商进行读空气...")
+
+            logger.debug("ResponseEngine: 正在调用LLM提供商...")
             # 使用 AstrBot 的 LLM 调用接口
-            # 注意：这里不传入历史对话记录，因为读空气是一个独立的判断过程
-            base_sys_prompt = "你是一个极其擅长'读空气'的聊天助手。你的核心任务是判断在特定聊天场景下，回复是否恰当。你需要理解社交暗示、聊天氛围和人际关系，从而做出最合适的决定：回复或保持沉默。"
-            persona = await self._resolve_persona_text(event)
+            # 注意：这里不传入历史对话记录，读空气与回复生成都是独立判断
             sys_prompt = self._compose_system_prompt_with_persona(base_sys_prompt, persona)
             llm_response = await provider.text_chat(
                 prompt=prompt,
-                contexts=[], # 读空气是独立判断，不依赖历史对话
+                contexts=[],
                 image_urls=[],
                 system_prompt=sys_prompt
             )
-            
+
             if llm_response and llm_response.completion_text:
-                logger.info(f"ResponseEngine: LLM读空气调用成功。回复: {llm_response.completion_text.strip()}")
+                logger.info(f"ResponseEngine: LLM调用成功。回复: {llm_response.completion_text.strip()}")
                 return llm_response.completion_text
             else:
-                logger.warning("ResponseEngine: LLM读空气调用成功，但返回内容为空。")
+                logger.warning("ResponseEngine: LLM调用成功，但返回内容为空。")
                 return ""
-            
+
         except Exception as e:
-            logger.error(f"ResponseEngine: LLM 读空气调用过程中发生异常: {e}", exc_info=True)
-            return ""  # 出错时默认不回复，保证系统稳定性
-    
-    async def _generate_normal_response(self, event: Any, chat_context: Dict[str, Any]) -> str:
+            logger.error(f"ResponseEngine: LLM 调用过程中发生异常: {e}", exc_info=True)
+            return ""  # 出错时返回空串，读空气路径默认不回复，保证系统稳定性
+
+    async def _generate_normal_response(
+        self, event: Any, chat_context: Dict[str, Any], user_id: str, message_str: str
+    ) -> str:
         """
         在决定需要回复后，调用LLM生成正常的回复内容。
-        
+
         Args:
             event: AstrBot的消息事件对象。
             chat_context: 完整的聊天上下文。
-            
+            user_id: 入口处提取的发送者ID。
+            message_str: 入口处提取的消息文本。
+
         Returns:
-            LLM生成的回复内容。如果生成失败，返回空字符串。
+            LLM生成的回复内容。如果生成失败，返回友好的兜底文案。
         """
         logger.debug("ResponseEngine: 构建正常回复提示词。")
-        # 构建传统回复提示
-        response_prompt = await self._build_response_prompt(event, chat_context)
-        
-        try:
-            provider = self.context.get_using_provider()
-            if not provider:
-                logger.error("ResponseEngine: 未找到可用的 LLM 提供商，无法生成回复。")
-                return "抱歉，我现在有点问题，稍后再回复你。"
-            
-            logger.debug("ResponseEngine: 正在调用LLM提供商生成回复...")
-            # 在生成正常回复时，可以考虑传入最近的对话历史作为上下文
-            # 但要注意，AstrBot的conversation_manager已经处理了对话历史，这里可能不需要重复传入
-            # 为了简单和避免上下文过长，这里也选择不传入，让LLM基于当前prompt独立生成
-            base_sys_prompt = "你是一个拟人化的聊天助手。你的回复风格应该自然、友好、富有同理心，并且完全符合当前的聊天语境。请避免过于机械或官方的语气。"
-            persona = await self._resolve_persona_text(event)
-            sys_prompt = self._compose_system_prompt_with_persona(base_sys_prompt, persona)
-            llm_response = await provider.text_chat(
-                prompt=response_prompt,
-                contexts=[],
-                image_urls=[],
-                system_prompt=sys_prompt
-            )
-            
-            if llm_response and llm_response.completion_text:
-                logger.info(f"ResponseEngine: LLM回复生成成功。内容: {llm_response.completion_text.strip()}")
-                return llm_response.completion_text
-            else:
-                logger.warning("ResponseEngine: LLM回复生成成功，但返回内容为空。")
-                return ""
-            
-        except Exception as e:
-            logger.error(f"ResponseEngine: 生成正常回复时发生异常: {e}", exc_info=True)
-            return "抱歉，我刚才走神了，能再说一遍吗？" # 友好的错误提示
+        # 与读空气流程一致，提示词构建与人格解析并发执行
+        response_prompt, persona = await asyncio.gather(
+            self._build_response_prompt(chat_context, user_id, message_str),
+            self._resolve_persona_text(event),
+        )
+
+        content = await self._call_chat(response_prompt, _NORMAL_RESPONSE_SYS_PROMPT, persona)
+        if content:
+            return content
+        return "抱歉，我现在有点问题，稍后再回复你。"  # 友好的错误提示
     
-    async def _build_response_prompt(self, event: Any, chat_context: Dict[str, Any]) -> str:
+    async def _build_response_prompt(
+        self, chat_context: Dict[str, Any], user_id: str, message_content: str
+    ) -> str:
         """
         为生成正常回复构建发送给LLM的提示词。
-        
+
         Args:
-            event: AstrBot的消息事件对象。
             chat_context: 完整的聊天上下文。
-            
+            user_id: 发送者ID。
+            message_content: 消息文本。
+
         Returns:
             构建好的提示词字符串。
         """
-        user_id = event.get_sender_id()
-        message_content = event.message_str
-        
         # 获取上下文信息，并提供默认值
         user_impression = chat_context.get("user_impression", {})
         conversation_history = chat_context.get("conversation_history", [])
         relevant_memories = chat_context.get("relevant_memories", [])
         
         impression_summary = user_impression.get('summary', '无印象信息')
-        memories_str = "\n".join([f"- {mem.get('content', '')}" for mem in relevant_memories[:2]]) if relevant_memories else "无相关记忆。"
-        history_str = "\n".join([f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in conversation_history[-2:]]) if conversation_history else "无最近对话。"
+        memories_str = "\n".join(
+            f"- {m['content']}" for m in relevant_memories[:2] if "content" in m
+        ) or "无相关记忆。"
+        history_str = "\n".join(
+            f"{m.get('role', '')}: {m.get('content', '')}" for m in conversation_history[-2:]
+        ) or "无最近对话。"
+
+        prompt = _RESPONSE_TEMPLATE.format_map({
+            "user_id": user_id,
+            "message_content": message_content,
+            "impression_summary": impression_summary,
+            "memories_str": memories_str,
+            "history_str": history_str,
+        })
 
-        prompt = f"""请根据以下上下文，对收到的消息生成一个自然、友好的回复。
-
-【收到的消息】
-用户ID: {user_id}
-消息内容: {message_content}
-
-【辅助上下文信息】
-- 用户印象摘要: {impression_summary}
-- 相关记忆: {memories_str}
-- 最近对话片段: {history_str}
-
-【回复要求】
-1.  **自然拟人**：你的回复应该像一个真实的人，而不是机器人。可以使用口语化的表达。
-2.  **语境贴合**：回复内容需要与当前聊天的主题和氛围保持一致。
-3.  **简洁明了**：避免过长或过于复杂的句子，直接回应消息的核心内容。
-4.  **富有个性**：如果用户印象中有相关信息（例如，用户喜欢幽默），可以适当融入你的回复风格中。
-
-请开始你的回复："""
-        
         logger.debug(f"ResponseEngine: 正常回复提示词构建完成。长度: {len(prompt)}")
         return prompt